@@ -11,46 +11,63 @@ class Library(StrEnum):
 
     @property
     def is_miplib(self) -> bool:
-        return self in {Library.MIPLIB_BENCHMARK, Library.MIPLIB_COLLECTION}
+        return self in _MIPLIB_LIBRARIES
 
     @property
     def family(self) -> str:
-        return "miplib" if self.is_miplib else self.value
+        return _FAMILIES[self]
 
     @property
     def tag(self) -> str:
         if not self.is_miplib:
             msg = "Tag is only available for MIPLIB libraries."
             raise ValueError(msg)
-        if self == Library.MIPLIB_BENCHMARK:
-            return "benchmark"
-        elif self == Library.MIPLIB_COLLECTION:
-            return "collection"
+        return _TAGS[self]
 
     @property
     def website(self) -> str:
-        if self.is_miplib:
-            return "https://miplib.zib.de/"
-        elif self == Library.MINLPLIB:
-            return "http://www.minlplib.org/"
-        elif self == Library.QPLIB:
-            return "http://www.qplib.de/"
+        return _WEBSITES[self]
 
     @property
     def table_url(self) -> str:
-        html = "instances.html"
-        if self.is_miplib:
-            html = f"tag_{self.tag}.html"
-        return f"{self.website}{html}"
+        return _TABLE_URLS[self]
 
-    @property
-    def download_url(self) -> str:
+    def build_download_url(self, name: str, fmt: str) -> str:
         if self.is_miplib:
-            return f"{self.website}" + "WebData/instances/" + "{name}.{fmt}"
+            return f"{self.website}WebData/instances/{name}.{fmt}"
         elif self == Library.MINLPLIB:
-            return f"{self.website}" + "{fmt}/{name}.{fmt}"
+            return f"{self.website}{fmt}/{name}.{fmt}"
         elif self == Library.QPLIB:
-            return f"{self.website}" + "{fmt}/QPLIB_{name}.{fmt}"
+            return f"{self.website}{fmt}/QPLIB_{name}.{fmt}"
+
+
+_MIPLIB_LIBRARIES = frozenset(
+    {Library.MIPLIB_BENCHMARK, Library.MIPLIB_COLLECTION}
+)
+_FAMILIES = {
+    Library.MIPLIB_BENCHMARK: "miplib",
+    Library.MIPLIB_COLLECTION: "miplib",
+    Library.MINLPLIB: Library.MINLPLIB.value,
+    Library.QPLIB: Library.QPLIB.value,
+}
+_TAGS = {
+    Library.MIPLIB_BENCHMARK: "benchmark",
+    Library.MIPLIB_COLLECTION: "collection",
+}
+_WEBSITES = {
+    Library.MIPLIB_BENCHMARK: "https://miplib.zib.de/",
+    Library.MIPLIB_COLLECTION: "https://miplib.zib.de/",
+    Library.MINLPLIB: "http://www.minlplib.org/",
+    Library.QPLIB: "http://www.qplib.de/",
+}
+_TABLE_URLS = {
+    library: (
+        f"{_WEBSITES[library]}tag_{_TAGS[library]}.html"
+        if library in _MIPLIB_LIBRARIES
+        else f"{_WEBSITES[library]}instances.html"
+    )
+    for library in Library
+}
 
 
 class Status(StrEnum):
@@ -81,7 +98,13 @@ class Format(StrEnum):
     LP = "lp"
 
 
-@dataclass
+_LIBRARIES = {member.value: member for member in Library}
+_STATUSES = {member.value: member for member in Status}
+_OPTIMIZATION_STATUSES = {member.value: member for member in OptimizationStatus}
+_PROBLEM_TYPES = {member.value: member for member in ProblemType}
+
+
+@dataclass(slots=True)
 class Instance:
     library: Library
     name: str
@@ -110,11 +133,17 @@ class Instance:
     formats: list[Format] = field(default_factory=list)
 
     def __post_init__(self):
-        self.library = Library(self.library)
-        self.problem_type = ProblemType(self.problem_type)
-        self.optimization_status = OptimizationStatus(self.optimization_status)
+        # StrEnum members hash like their values, so one dict lookup covers
+        # both members and raw strings; the constructor only runs to raise.
+        self.library = _LIBRARIES.get(self.library) or Library(self.library)
+        self.problem_type = _PROBLEM_TYPES.get(
+            self.problem_type
+        ) or ProblemType(self.problem_type)
+        self.optimization_status = _OPTIMIZATION_STATUSES.get(
+            self.optimization_status
+        ) or OptimizationStatus(self.optimization_status)
         if self.status is not None:
-            self.status = Status(self.status)
+            self.status = _STATUSES.get(self.status) or Status(self.status)
 
     def remove(self):
         if self.path is not None and self.path.exists():
@@ -172,9 +201,7 @@ class Instance:
         if self.formats:
             attrs["Formats"] = ", ".join(self.formats)
 
-        max_key_length = max(len(key) for key in attrs)
-        description = "\n".join(
-            f"{key.ljust(max_key_length)}: {value}"
-            for key, value in attrs.items()
+        width = max(map(len, attrs))
+        return "\n".join(
+            f"{key:<{width}}: {value}" for key, value in attrs.items()
         )
-        return description
@@ -1,22 +1,20 @@
+from __future__ import annotations
+
+import ast
 import gzip
 import io
+import os
 import re
 import shlex
+import tempfile
+import threading
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
-from functools import partial
+from functools import cached_property, lru_cache, partial
 from pathlib import Path
-
-import pandas as pd
-import requests
-from filelock import FileLock, Timeout
-from rich.console import Console
-from rich.progress import (
-    BarColumn,
-    Progress,
-    SpinnerColumn,
-    TextColumn,
-    TimeElapsedColumn,
-)
+from typing import TYPE_CHECKING, Any
 
 from .instance import (
     Format,
@@ -27,6 +25,11 @@ from .instance import (
     Status,
 )
 
+if TYPE_CHECKING:
+    import pandas as pd
+    from rich.console import Console
+    from rich.progress import Progress, TaskID
+
 
 @dataclass(frozen=True)
 class Columns:
@@ -53,13 +56,55 @@ class Columns:
 
 COLUMNS = Columns()
 
+_UNBOUNDED_PATTERN = re.compile(OptimizationStatus.UNBOUNDED, re.IGNORECASE)
+_INFEASIBLE_PATTERN = re.compile(OptimizationStatus.INFEASIBLE, re.IGNORECASE)
+_OPEN_PATTERN = re.compile(Status.OPEN, re.IGNORECASE)
+_EQUALITY_PATTERN = re.compile(r"^\s*([A-Za-z_]\w*)\s*==\s*(.+?)\s*$")
+
+
+@lru_cache(maxsize=256)
+def _compile_filter(expression: str) -> str | tuple[tuple[str, Any], ...]:
+    match = _EQUALITY_PATTERN.match(expression)
+    if match is None:
+        return expression
+    column, literal = match.groups()
+    try:
+        value = ast.literal_eval(literal)
+    except (ValueError, SyntaxError):
+        return expression
+    if not isinstance(value, str | int | float):
+        return expression
+    return ((column, value),)
+
+
+def _compile_mapping(spec: Mapping[str, Any]) -> tuple[tuple[str, Any], ...]:
+    for column, value in spec.items():
+        if not isinstance(value, str | int | float):
+            msg = (
+                f"Filter value for column {column!r} must be a str, int"
+                f" or float, got {type(value).__name__}."
+            )
+            raise ValueError(msg)
+    return tuple(spec.items())
+
+
+def _split_tags(text: str) -> list[str]:
+    if '"' in text or "'" in text:
+        return shlex.split(text)
+    return text.split()
+
 
 class OpenMIP:
     _LOCK_TIMEOUT = 60
+    _CHUNK_SIZE = 1 << 20
+    _FILTERED_CACHE_SIZE = 32
 
     cache_path: Path
-    console: Console
-    progress: Progress
+    verbose: bool
+    _progress_lock: threading.RLock
+    _progress_users: int
+    _tables_cache: dict[tuple, pd.DataFrame]
+    _filtered_cache: dict[tuple, pd.DataFrame]
 
     def __init__(
         self,
@@ -69,49 +114,71 @@ class OpenMIP:
     ) -> None:
         self.cache_path = Path(cache_path).expanduser().resolve()
         self.cache_path.mkdir(parents=True, exist_ok=True)
-        self.console = Console(quiet=not verbose)
-        self.progress = Progress(
+        self.verbose = verbose
+        self._progress_lock = threading.RLock()
+        self._progress_users = 0
+        self._tables_cache = {}
+        self._filtered_cache = {}
+
+    @cached_property
+    def console(self) -> Console:
+        from rich.console import Console
+
+        return Console(quiet=not self.verbose)
+
+    @cached_property
+    def progress(self) -> Progress:
+        from rich.progress import (
+            BarColumn,
+            Progress,
+            SpinnerColumn,
+            TextColumn,
+            TimeElapsedColumn,
+        )
+
+        return Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
             BarColumn(),
             TimeElapsedColumn(),
             console=self.console,
             transient=True,
-            disable=not verbose,
+            disable=not self.verbose,
         )
 
     def load(
         self,
         library: Library,
-        *filters: str,
+        *filters: str | Mapping[str, Any],
         refresh: bool = False,
     ) -> list[Instance]:
         library = Library(library)
-        filters = tuple(filters or ())
-
-        csv_path = self._locate_cache_path(library) / "instances.csv"
-        lock_path = csv_path.with_suffix(".lock")
-        try:
-            with FileLock(str(lock_path), timeout=self._LOCK_TIMEOUT):
-                if refresh or not csv_path.exists():
-                    table = self._download_table(library)
-                    table = self._preprocess_table(table, library)
-                    self._write_csv(table, csv_path)
-                else:
-                    table = pd.read_csv(csv_path)
-        except Timeout:
-            msg = (
-                "[yellow]Another OpenMIP process is busy;"
-                " using existing cache.[/yellow]"
-            )
-            self.console.print(msg, end="")
-            table = pd.read_csv(csv_path)
-
-        if filters:
-            query = " & ".join(f for f in filters)
-            table = table.query(query)
+        specs = tuple(
+            _compile_filter(spec)
+            if isinstance(spec, str)
+            else _compile_mapping(spec)
+            for spec in filters
+        )
 
-        return self._build_instances(table, library)
+        table_path = self._locate_cache_path(library) / "instances.parquet"
+        if refresh:
+            self._clear_cache(library)
+
+        key = self._cache_key(library, table_path)
+        table = self._tables_cache.get(key)
+        if table is None:
+            self._clear_cache(library)
+            table = self._read_table(library, table_path, refresh=refresh)
+            key = self._cache_key(library, table_path)
+            self._tables_cache[key] = table
+
+        filtered = self._filtered_cache.get((*key, specs))
+        if filtered is None:
+            filtered = self._filter_table(table, specs) if specs else table
+            if len(self._filtered_cache) >= self._FILTERED_CACHE_SIZE:
+                del self._filtered_cache[next(iter(self._filtered_cache))]
+            self._filtered_cache[(*key, specs)] = filtered
+        return self._build_instances(filtered, library)
 
     def download(
         self,
@@ -152,38 +219,93 @@ class OpenMIP:
 
         instance.path.parent.mkdir(parents=True, exist_ok=True)
 
-        tmp = instance.path.with_suffix(".tmp")
-        url = library.download_url.format(name=instance.name, fmt=fmt)
+        url = library.build_download_url(instance.name, fmt)
         if library.is_miplib:
             url += ".gz"
         else:
             msg = f"Library {library} not supported yet."
             raise NotImplementedError(msg)
-        with self.progress:
-            desc = (
-                f"[cyan]Downloading [bold]{instance.name}[/bold] "
-                f"instance...[/cyan]"
-            )
-            task = self.progress.add_task(desc, total=None)
-            try:
-                response = requests.get(url, timeout=30)
-                response.raise_for_status()
-                with tmp.open("wb") as writer:
-                    writer.write(response.content)
-            finally:
-                self.progress.update(task, completed=1)
-                self.progress.remove_task(task)
-                msg = f"[green]Downloaded {instance.name}.[/green]"
-                self.console.print(msg)
-        if library.is_miplib:
+        fd, name = tempfile.mkstemp(
+            suffix=".tmp",
+            prefix=f"{instance.name}.",
+            dir=instance.path.parent,
+        )
+        os.close(fd)
+        tmp = Path(name)
+        try:
+            with self._track_progress():
+                desc = (
+                    f"[cyan]Downloading [bold]{instance.name}[/bold] "
+                    f"instance...[/cyan]"
+                )
+                with self._progress_lock:
+                    task = self.progress.add_task(desc, total=None)
+                try:
+                    self._download_gzip(url, tmp, task)
+                finally:
+                    with self._progress_lock:
+                        self.progress.remove_task(task)
+                    msg = f"[green]Downloaded {instance.name}.[/green]"
+                    self.console.print(msg)
+            tmp.replace(instance.path)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def download_many(
+        self,
+        instances: Iterable[Instance],
+        *,
+        fmt: Format | None = None,
+        refresh: bool = False,
+        subdir: str | None = None,
+        max_workers: int = 8,
+    ) -> None:
+        download = partial(
+            self.download,
+            fmt=fmt,
+            refresh=refresh,
+            subdir=subdir,
+        )
+        with (
+            self._track_progress(),
+            ThreadPoolExecutor(max_workers=max_workers) as executor,
+        ):
+            list(executor.map(download, instances))
+
+    @contextmanager
+    def _track_progress(self) -> Iterator[Progress]:
+        with self._progress_lock:
+            if self._progress_users == 0:
+                self.progress.start()
+            self._progress_users += 1
+        try:
+            yield self.progress
+        finally:
+            with self._progress_lock:
+                self._progress_users -= 1
+                if self._progress_users == 0:
+                    self.progress.stop()
+
+    def _download_gzip(self, url: str, path: Path, task: TaskID) -> None:
+        import requests
+
+        with requests.get(url, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            size = int(response.headers.get("Content-Length", 0))
+            with self._progress_lock:
+                self.progress.update(task, total=size or None)
             with (
-                gzip.open(tmp, "rb") as reader,
-                instance.path.open("wb") as writer,
+                gzip.GzipFile(fileobj=response.raw) as reader,
+                path.open("wb") as writer,
             ):
-                writer.write(reader.read())
-        else:
-            tmp.replace(instance.path)
-        tmp.unlink(missing_ok=True)
+                while chunk := reader.read(self._CHUNK_SIZE):
+                    writer.write(chunk)
+                    with self._progress_lock:
+                        self.progress.update(
+                            task,
+                            completed=response.raw.tell(),
+                        )
 
     def _locate_cache_path(self, library: Library) -> Path:
         if library.is_miplib:
@@ -194,20 +316,90 @@ class OpenMIP:
         path.mkdir(parents=True, exist_ok=True)
         return path
 
+    @staticmethod
+    def _cache_key(
+        library: Library,
+        table_path: Path,
+    ) -> tuple[Library, str, int] | None:
+        if not table_path.exists():
+            return None
+        return library, str(table_path), table_path.stat().st_mtime_ns
+
+    def _clear_cache(self, library: Library) -> None:
+        for cache in (self._tables_cache, self._filtered_cache):
+            for key in [key for key in cache if key[0] == library]:
+                del cache[key]
+
+    def _read_table(
+        self,
+        library: Library,
+        table_path: Path,
+        *,
+        refresh: bool,
+    ) -> pd.DataFrame:
+        if not refresh and table_path.exists():
+            return self._read_parquet(table_path)
+
+        from filelock import FileLock, Timeout
+
+        lock_path = table_path.with_suffix(".lock")
+        try:
+            with FileLock(str(lock_path), timeout=self._LOCK_TIMEOUT):
+                if refresh or not table_path.exists():
+                    table = self._download_table(library)
+                    table = self._preprocess_table(table, library)
+                    table = self._write_parquet(table, table_path)
+                else:
+                    table = self._read_parquet(table_path)
+        except Timeout:
+            msg = (
+                "[yellow]Another OpenMIP process is busy;"
+                " using existing cache.[/yellow]"
+            )
+            self.console.print(msg, end="")
+            table = self._read_parquet(table_path)
+        return table
+
+    @staticmethod
+    def _filter_table(
+        table: pd.DataFrame,
+        specs: tuple[str | tuple[tuple[str, Any], ...], ...],
+    ) -> pd.DataFrame:
+        import numpy as np
+
+        mask = np.ones(len(table), dtype=bool)
+        queries = []
+        for spec in specs:
+            if isinstance(spec, str):
+                queries.append(spec)
+                continue
+            for column, value in spec:
+                equal = table[column] == value
+                mask &= equal.to_numpy(dtype=bool, na_value=False)
+        table = table[mask]
+        if queries:
+            table = table.query(" & ".join(queries))
+        return table
+
     def _download_table(self, library: Library) -> pd.DataFrame:
-        with self.progress:
+        import pandas as pd
+        import requests
+
+        with self._track_progress():
             desc = (
                 f"[cyan]Downloading [bold]{library.name}[/bold] table...[/cyan]"
             )
-            task = self.progress.add_task(desc, total=None)
+            with self._progress_lock:
+                task = self.progress.add_task(desc, total=None)
             try:
                 response = requests.get(library.table_url, timeout=30)
                 response.raise_for_status()
                 reader = io.StringIO(response.text)
                 tables = pd.read_html(reader)
             finally:
-                self.progress.update(task, completed=1)
-                self.progress.remove_task(task)
+                with self._progress_lock:
+                    self.progress.update(task, completed=1)
+                    self.progress.remove_task(task)
 
         if not tables:
             raise RuntimeError(f"No tables found at {library.table_url}")
@@ -226,13 +418,24 @@ class OpenMIP:
         return table
 
     @staticmethod
-    def _write_csv(table: pd.DataFrame, path: Path) -> None:
+    def _read_parquet(path: Path) -> pd.DataFrame:
+        import pandas as pd
+
+        return pd.read_parquet(path, dtype_backend="pyarrow")
+
+    @staticmethod
+    def _write_parquet(table: pd.DataFrame, path: Path) -> pd.DataFrame:
         tmp_path = path.with_suffix(".tmp")
-        table.to_csv(tmp_path, index=False)
+        table = table.convert_dtypes(dtype_backend="pyarrow")
+        table.to_parquet(tmp_path, index=False, compression="zstd")
         tmp_path.replace(path)
+        return table
 
     @staticmethod
     def _preprocess_miplib(table: pd.DataFrame) -> pd.DataFrame:
+        import numpy as np
+        import pandas as pd
+
         mapping = {
             "Instance": COLUMNS.NAME,
             "Status": COLUMNS.STATUS,
@@ -248,54 +451,53 @@ class OpenMIP:
         }
         table = table.rename(columns=mapping)[mapping.values()]
 
-        def _mip_type(row: pd.Series) -> str:
-            n_vars = int(row[COLUMNS.N_VARS])
-            n_bins = int(row[COLUMNS.N_BINS])
-            n_ints = int(row[COLUMNS.N_INTS])
-            n_conts = int(row[COLUMNS.N_CONTS])
-            if n_conts == n_vars:
-                return ProblemType.LP
-            if n_bins == n_vars:
-                return ProblemType.BLP
-            if n_ints == n_vars:
-                return ProblemType.ILP
-            if n_ints == 0:
-                return ProblemType.MBLP
-            return ProblemType.MILP
-
-        table[COLUMNS.TYPE] = table.apply(_mip_type, axis=1)
-
-        unbounded = table[COLUMNS.PRIMAL].str.contains(
-            OptimizationStatus.UNBOUNDED,
-            flags=re.IGNORECASE,
-            na=False,
-        )
-        infeasible = table[COLUMNS.PRIMAL].str.contains(
-            OptimizationStatus.INFEASIBLE,
-            flags=re.IGNORECASE,
-            na=False,
-        )
-        is_open = table[COLUMNS.STATUS].str.contains(
-            Status.OPEN,
-            flags=re.IGNORECASE,
-            na=True,
+        n_vars = table[COLUMNS.N_VARS].to_numpy()
+        n_bins = table[COLUMNS.N_BINS].to_numpy()
+        n_ints = table[COLUMNS.N_INTS].to_numpy()
+        n_conts = table[COLUMNS.N_CONTS].to_numpy()
+        table[COLUMNS.TYPE] = np.select(
+            [
+                n_conts == n_vars,
+                n_bins == n_vars,
+                n_ints == n_vars,
+                n_ints == 0,
+            ],
+            [
+                ProblemType.LP,
+                ProblemType.BLP,
+                ProblemType.ILP,
+                ProblemType.MBLP,
+            ],
+            default=ProblemType.MILP,
         )
+
+        primal = table[COLUMNS.PRIMAL].astype("string")
+        status = table[COLUMNS.STATUS].astype("string")
+        unbounded = primal.str.contains(_UNBOUNDED_PATTERN, na=False)
+        infeasible = primal.str.contains(_INFEASIBLE_PATTERN, na=False)
+        is_open = status.str.contains(_OPEN_PATTERN, na=True)
         optimal = ~(is_open | unbounded | infeasible)
-        starred = table[COLUMNS.PRIMAL].str.endswith("*", na=False)
+        starred = primal.str.endswith("*", na=False)
         feasible = is_open & starred
         has_primal = optimal | feasible
-        table.loc[has_primal, COLUMNS.PRIMAL] = (
-            table.loc[has_primal, COLUMNS.PRIMAL]
-            .str.rstrip("*")
-            .apply(pd.to_numeric, errors="coerce")
+        values = pd.to_numeric(primal.str.rstrip("*"), errors="coerce")
+        values = values.astype("Float64")
+        table[COLUMNS.PRIMAL] = values.where(has_primal, pd.NA)
+        table[COLUMNS.OPTIMIZATION_STATUS] = np.select(
+            [
+                feasible.to_numpy(dtype=bool),
+                infeasible.to_numpy(dtype=bool),
+                unbounded.to_numpy(dtype=bool),
+                optimal.to_numpy(dtype=bool),
+            ],
+            [
+                OptimizationStatus.FEASIBLE,
+                OptimizationStatus.INFEASIBLE,
+                OptimizationStatus.UNBOUNDED,
+                OptimizationStatus.OPTIMAL,
+            ],
+            default=OptimizationStatus.UNKNOWN,
         )
-        table.loc[~has_primal, COLUMNS.PRIMAL] = pd.NA
-        column = COLUMNS.OPTIMIZATION_STATUS
-        table[column] = OptimizationStatus.UNKNOWN
-        table.loc[optimal, column] = OptimizationStatus.OPTIMAL
-        table.loc[unbounded, column] = OptimizationStatus.UNBOUNDED
-        table.loc[infeasible, column] = OptimizationStatus.INFEASIBLE
-        table.loc[feasible, column] = OptimizationStatus.FEASIBLE
 
         return table
 
@@ -305,43 +507,69 @@ class OpenMIP:
         library: Library,
     ) -> list[Instance]:
         if library.is_miplib:
-            builder = partial(self._build_miplib_instance, library=library)
-        else:
-            msg = f"Library {library} not supported yet."
-            raise NotImplementedError(msg)
-        return [builder(row) for _, row in table.iterrows()]
+            return self._build_miplib_instances(table, library)
+        msg = f"Library {library} not supported yet."
+        raise NotImplementedError(msg)
 
-    def _build_miplib_instance(
-        self,
-        series: pd.Series,
-        *,
+    @staticmethod
+    def _build_miplib_instances(
+        table: pd.DataFrame,
         library: Library,
-    ) -> Instance:
-        tags = (
-            shlex.split(str(series[COLUMNS.TAGS]))
-            if pd.notna(series[COLUMNS.TAGS])
-            else []
-        )
-        tags = [tag.strip() for tag in tags if tag.strip()]
-        objective = (
-            series[COLUMNS.PRIMAL] if pd.notna(series[COLUMNS.PRIMAL]) else None
-        )
-        return Instance(
-            library=library,
-            name=str(series[COLUMNS.NAME]),
-            path=None,
-            problem_type=str(series[COLUMNS.TYPE]),
-            status=str(series[COLUMNS.STATUS]),
-            optimization_status=str(series[COLUMNS.OPTIMIZATION_STATUS]),
-            primal=objective,
-            dual=objective,
-            n_vars=int(series[COLUMNS.N_VARS]),
-            n_bins=int(series[COLUMNS.N_BINS]),
-            n_ints=int(series[COLUMNS.N_INTS]),
-            n_conts=int(series[COLUMNS.N_CONTS]),
-            n_cons=int(series[COLUMNS.N_CONS]),
-            n_nz=int(series[COLUMNS.N_NZ]),
-            group=series[COLUMNS.GROUP],
-            tags=tags,
-            formats=[Format.MPS],
-        )
+    ) -> list[Instance]:
+        def values(column: str) -> list:
+            array = table[column].to_numpy(dtype=object, na_value=None)
+            return array.tolist()
+
+        tags = [_split_tags(text or "") for text in values(COLUMNS.TAGS)]
+        primals = values(COLUMNS.PRIMAL)
+        return [
+            Instance(
+                library=library,
+                name=name,
+                path=None,
+                problem_type=problem_type,
+                status=status,
+                optimization_status=optimization_status,
+                primal=primal,
+                dual=primal,
+                n_vars=n_vars,
+                n_bins=n_bins,
+                n_ints=n_ints,
+                n_conts=n_conts,
+                n_cons=n_cons,
+                n_nz=n_nz,
+                group=group,
+                tags=instance_tags,
+                formats=[Format.MPS],
+            )
+            for (
+                name,
+                problem_type,
+                status,
+                optimization_status,
+                primal,
+                n_vars,
+                n_bins,
+                n_ints,
+                n_conts,
+                n_cons,
+                n_nz,
+                group,
+                instance_tags,
+            ) in zip(
+                values(COLUMNS.NAME),
+                values(COLUMNS.TYPE),
+                values(COLUMNS.STATUS),
+                values(COLUMNS.OPTIMIZATION_STATUS),
+                primals,
+                values(COLUMNS.N_VARS),
+                values(COLUMNS.N_BINS),
+                values(COLUMNS.N_INTS),
+                values(COLUMNS.N_CONTS),
+                values(COLUMNS.N_CONS),
+                values(COLUMNS.N_NZ),
+                values(COLUMNS.GROUP),
+                tags,
+                strict=True,
+            )
+        ]